@@ -1,24 +1,38 @@
 """FastAPI server for the Fake LLM."""
 
-from collections.abc import AsyncIterator, Iterator
+import asyncio
+import contextlib
+import functools
+import inspect
+import json
+import threading
+import weakref
+from collections.abc import AsyncIterator, Generator, Mapping
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
-from typing import Any
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, TypedDict, cast
 
 import jinja2
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
 from llama_cpp import Llama, llama_chat_format
-from llama_cpp.llama_types import (
-    ChatCompletion,
-    ChatCompletionChunk,
-)
 from pydantic import BaseModel, ConfigDict
+from starlette.types import Receive, Scope, Send
+
+from ._models import DownloadedModel, ModelSpec
 
-from ._models import ModelSpec
+if TYPE_CHECKING:
+    from llama_cpp.llama_types import ChatCompletion, ChatCompletionChunk
 
-# Monkeypatch Jinja2ChatFormatter to survive bad templates (like SmolLM3's)
-_original_jinja2_formatter_init = llama_chat_format.Jinja2ChatFormatter.__init__
+# Monkeypatch Jinja2ChatFormatter to survive bad templates (like SmolLM3's).
+# Unwrapping keeps the patches from stacking up if this module is reloaded.
+_original_jinja2_formatter_init = inspect.unwrap(
+    llama_chat_format.Jinja2ChatFormatter.__init__
+)
 
 
+@functools.wraps(_original_jinja2_formatter_init)
 def _safe_jinja2_formatter_init(
     self: Any,  # noqa: ANN401
     template: str,
@@ -56,7 +70,10 @@ def _safe_jinja2_formatter_init(
 llama_chat_format.Jinja2ChatFormatter.__init__ = _safe_jinja2_formatter_init  # type: ignore[method-assign]
 
 
-type ServingConfiguration = dict[str, Llama]
+type ServingConfiguration = Mapping[str, Llama]
+
+# Upper bound on the threads used to download and load models concurrently.
+_MAX_LOADING_THREADS = 8
 
 
 def parse_server_args(
@@ -81,31 +98,74 @@ def parse_server_args(
         raise TypeError(msg)
 
     # Validate aliases
-    for target in aliases.values():
-        if target not in model_names:
-            msg = f"Alias target '{target}' not in model_names"
-            raise ValueError(msg)
+    unknown_targets = set(aliases.values()).difference(model_names)
+    if unknown_targets:
+        # Report the same target every time, even though sets are unordered.
+        msg = f"Alias target '{min(unknown_targets)}' not in model_names"
+        raise ValueError(msg)
+
+    # Download and load all models in model_names. Downloads are I/O-bound, so they
+    # run concurrently. DownloadedModel.load() serializes the Llama constructors.
+    max_workers = max(1, min(_MAX_LOADING_THREADS, len(model_names)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Every name is resolved before any download starts, so an unsupported
+        # name fails right away instead of after the other models are downloaded.
+        model_specs = list(executor.map(ModelSpec.from_name, model_names))
+        downloaded_models = list(executor.map(ModelSpec.download, model_specs))
+
+        # Load each model file once, even if multiple names resolve to it
+        unique_models: dict[str, DownloadedModel] = {}
+        for model in downloaded_models:
+            unique_models.setdefault(model.model_path, model)
+        loaded_models = dict(
+            zip(
+                unique_models,
+                executor.map(DownloadedModel.load, unique_models.values()),
+                strict=True,
+            )
+        )
 
-    downloaded_specs = {}
-    loaded_models = {}
-    llms: ServingConfiguration = {}
+    llms = {
+        name: loaded_models[model.model_path]
+        for name, model in zip(model_names, downloaded_models, strict=True)
+    }
 
-    # Download and load all models in model_names
-    for name in model_names:
-        spec = ModelSpec.from_name(name).download()
-        downloaded_specs[name] = spec
+    # Map aliases. Targets are guaranteed to be in model_names and thus in llms.
+    llms.update({alias: llms[target] for alias, target in aliases.items()})
 
-        if spec.model_path not in loaded_models:
-            loaded_models[spec.model_path] = spec.load()
+    # The configuration is shared by the serving thread, so it must not change.
+    return MappingProxyType(llms)
 
-        llms[name] = loaded_models[spec.model_path]
 
-    # Map aliases
-    for alias, target in aliases.items():
-        # Target is guaranteed to be in model_names and thus in llms
-        llms[alias] = llms[target]
+# Runs the inference calls for each Llama instance, one at a time.
+#
+# Llama instances are not thread-safe, and may be shared by multiple names in a
+# ServingConfiguration and by multiple FakeLLMServer instances. Requests waiting
+# for a model are queued in its executor, so they don't tie up the threads that
+# serve other requests.
+_inference_executors: weakref.WeakKeyDictionary[Llama, ThreadPoolExecutor] = (
+    weakref.WeakKeyDictionary()
+)
+_inference_executors_lock = threading.Lock()
+
 
-    return llms
+def _inference_executor(llm: Llama) -> ThreadPoolExecutor:
+    """Returns the executor that must run all inference calls on a model.
+
+    Args:
+        llm: The Llama instance that will be used for inference.
+
+    Returns:
+        A single-threaded executor associated with the Llama instance.
+    """
+    with _inference_executors_lock:
+        executor = _inference_executors.get(llm)
+        if executor is None:
+            executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="fake-llm-inference"
+            )
+            _inference_executors[llm] = executor
+        return executor
 
 
 @asynccontextmanager
@@ -125,8 +185,12 @@ async def _lifespan(application: FastAPI) -> AsyncIterator[None]:
         del application.state.llms
 
 
-class _ChatMessage(BaseModel):
-    """Represents a single message in a chat completion request."""
+class _ChatMessage(TypedDict):
+    """Represents a single message in a chat completion request.
+
+    This is a TypedDict so validated messages are plain dictionaries, which can
+    be passed to llama.cpp without conversion.
+    """
 
     role: str
     content: str
@@ -146,11 +210,175 @@ class _ChatCompletionRequest(BaseModel):
     model_config = ConfigDict(extra="ignore")
 
 
+def _create_chat_completion(
+    llm: Llama, request: _ChatCompletionRequest
+) -> "ChatCompletion":
+    """Generates a complete chat completion. Runs on the model's executor.
+
+    Args:
+        llm: The Llama instance used for inference.
+        request: The chat completion request.
+
+    Returns:
+        The chat completion generated by llama.cpp.
+    """
+    return cast(
+        "ChatCompletion",
+        llm.create_chat_completion(
+            messages=request.messages,  # type: ignore[arg-type]
+            max_tokens=request.max_tokens,
+            temperature=request.temperature,
+            top_p=request.top_p,
+        ),
+    )
+
+
+# Marks the end of a _ChatCompletionStream.
+_END_OF_STREAM = None
+
+
+class _ChatCompletionStream:
+    """Runs a streaming chat completion on the model's executor.
+
+    Token generation occupies the model's executor until the stream ends or is
+    closed. Generating on the executor, instead of in a generator advanced by
+    Starlette's threadpool, ensures that a disconnected client can't leave the
+    model busy, and that the stream can't be starved of threads.
+    """
+
+    def __init__(self, llm: Llama, request: _ChatCompletionRequest) -> None:
+        """Starts generating the chat completion.
+
+        Must be called on the event loop that consumes the stream.
+
+        Args:
+            llm: The Llama instance used for inference.
+            request: The chat completion request.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._chunks: asyncio.Queue[ChatCompletionChunk | Exception | None] = (
+            asyncio.Queue()
+        )
+        self._closed = threading.Event()
+        _inference_executor(llm).submit(self._generate, llm, request)
+
+    async def next_chunk(self) -> "ChatCompletionChunk | None":
+        """Waits for the next chunk of the chat completion.
+
+        Returns:
+            The next chunk, or None if the stream ended.
+
+        Raises:
+            Exception: The error raised by llama.cpp while generating the chunk.
+        """
+        chunk = await self._chunks.get()
+        if isinstance(chunk, Exception):
+            raise chunk
+        return chunk
+
+    def close(self) -> None:
+        """Stops generating chunks, and releases the model as soon as possible."""
+        self._closed.set()
+
+    def _generate(self, llm: Llama, request: _ChatCompletionRequest) -> None:
+        """Generates the chat completion's chunks. Runs on the model's executor.
+
+        Args:
+            llm: The Llama instance used for inference.
+            request: The chat completion request.
+        """
+        if self._closed.is_set():
+            return
+        try:
+            chunks = cast(
+                "Generator[ChatCompletionChunk]",
+                llm.create_chat_completion(
+                    messages=request.messages,  # type: ignore[arg-type]
+                    max_tokens=request.max_tokens,
+                    temperature=request.temperature,
+                    top_p=request.top_p,
+                    stream=True,
+                ),
+            )
+            # Closing the generator stops llama.cpp before the next request runs.
+            with contextlib.closing(chunks):
+                for chunk in chunks:
+                    if self._closed.is_set():
+                        return
+                    self._put(chunk)
+        except Exception as e:  # noqa: BLE001
+            self._put(e)
+        else:
+            self._put(_END_OF_STREAM)
+
+    def _put(self, chunk: "ChatCompletionChunk | Exception | None") -> None:
+        """Hands a chunk over to the event loop. Runs on the model's executor.
+
+        Args:
+            chunk: The chunk, the error that ended the stream, or _END_OF_STREAM.
+        """
+        # The event loop is closed if the server stopped while streaming.
+        with contextlib.suppress(RuntimeError):
+            self._loop.call_soon_threadsafe(self._chunks.put_nowait, chunk)
+
+
+async def _server_sent_events(
+    stream: _ChatCompletionStream, first_chunk: "ChatCompletionChunk | None"
+) -> AsyncIterator[str]:
+    """Generates the server-sent events for a streaming chat completion.
+
+    Args:
+        stream: The chat completion stream.
+        first_chunk: The stream's first chunk, which was already received.
+
+    Yields:
+        Server-sent event frames, in the format used by the OpenAI API.
+    """
+    chunk = first_chunk
+    while chunk is not None:
+        yield f"data: {json.dumps(chunk)}\n\n"
+        chunk = await stream.next_chunk()
+    yield "data: [DONE]\n\n"
+
+
+class _ChatCompletionStreamResponse(StreamingResponse):
+    """Sends a chat completion stream as server-sent events."""
+
+    def __init__(
+        self, stream: _ChatCompletionStream, first_chunk: "ChatCompletionChunk | None"
+    ) -> None:
+        """Initializes the response.
+
+        Args:
+            stream: The chat completion stream.
+            first_chunk: The stream's first chunk, which was already received.
+        """
+        super().__init__(
+            _server_sent_events(stream, first_chunk), media_type="text/event-stream"
+        )
+        self._stream = stream
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Sends the response, and stops the stream if the client disconnects.
+
+        Args:
+            scope: The ASGI connection scope.
+            receive: The ASGI receive channel.
+            send: The ASGI send channel.
+        """
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # The body iterator may be left suspended, so it can't be relied on to
+            # close the stream.
+            self._stream.close()
+
+
 def create_server_app(llms: ServingConfiguration) -> FastAPI:
     """Creates a FastAPI application for serving LLM models.
 
     Args:
-        llms: A dictionary mapping model aliases to Llama instances.
+        llms: A mapping from model names and aliases to Llama instances.
 
     Returns:
         A FastAPI application.
@@ -159,22 +387,22 @@ def create_server_app(llms: ServingConfiguration) -> FastAPI:
     app.state.llms = llms
 
     @app.post("/v1/chat/completions", response_model=None)
-    def create_chat_completion(
+    async def create_chat_completion(
         request: _ChatCompletionRequest,
-    ) -> ChatCompletion | Iterator[ChatCompletionChunk]:
+    ) -> JSONResponse | StreamingResponse:
         """Endpoint for creating chat completions.
 
         Args:
             request: The chat completion request.
 
         Returns:
-            The generated chat completion response.
+            The generated chat completion response, or a stream of server-sent
+            events if the request asks for streaming.
 
         Raises:
             HTTPException: If the model is not loaded or an error occurs during
                 inference.
         """
-        llms: dict[str, Llama] = getattr(app.state, "llms", {})
         llm = llms.get(request.model)
 
         if not llm:
@@ -182,31 +410,36 @@ def create_server_app(llms: ServingConfiguration) -> FastAPI:
                 status_code=404, detail=f"Model '{request.model}' not found"
             )
 
-        messages = [msg.model_dump() for msg in request.messages]
+        if request.stream:
+            stream = _ChatCompletionStream(llm, request)
+            # Waiting for the first chunk turns errors that happen before any
+            # tokens are generated, such as oversized prompts, into 500 responses.
+            try:
+                first_chunk = await stream.next_chunk()
+            except Exception as e:
+                stream.close()
+                raise HTTPException(status_code=500, detail=str(e)) from e
+            except BaseException:
+                stream.close()
+                raise
+            return _ChatCompletionStreamResponse(stream, first_chunk)
 
         try:
-            return llm.create_chat_completion(
-                messages=messages,  # type: ignore[arg-type]
-                max_tokens=request.max_tokens,
-                temperature=request.temperature,
-                top_p=request.top_p,
-                stream=request.stream,
+            # Concurrent requests for the same model queue up in the executor.
+            completion = await asyncio.wrap_future(
+                _inference_executor(llm).submit(_create_chat_completion, llm, request)
             )
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e)) from e
 
-    @app.get("/v1/models")
-    def list_models(request: Request) -> dict[str, Any]:
-        """Endpoint for listing available models.
-
-        Args:
-            request: The FastAPI request instance.
+        # llama.cpp returns JSON-compatible data, so it doesn't need to go through
+        # FastAPI's much slower jsonable_encoder.
+        return JSONResponse(completion)
 
-        Returns:
-            A dictionary containing the list of available models.
-        """
-        llms: dict[str, Llama] = getattr(request.app.state, "llms", {})
-        return {
+    # The served models don't change after startup, so the response is rendered
+    # once and re-sent for every request.
+    models_response = JSONResponse(
+        {
             "object": "list",
             "data": [
                 {
@@ -218,5 +451,15 @@ def create_server_app(llms: ServingConfiguration) -> FastAPI:
                 for model_id in llms
             ],
         }
+    )
+
+    @app.get("/v1/models")
+    def list_models() -> JSONResponse:
+        """Endpoint for listing available models.
+
+        Returns:
+            A response containing the list of available models.
+        """
+        return models_response
 
     return app
@@ -1,15 +1,71 @@
 """Models and specifications for LLM models."""
 
+import contextlib
+import functools
 import os
+import re
+import threading
+import weakref
+from collections.abc import Mapping
 from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
 from typing import Any, cast
 
+import httpx
 import psutil
-from huggingface_hub import hf_hub_download, list_repo_files
+from huggingface_hub import hf_hub_download, list_repo_files, snapshot_download
+from huggingface_hub.errors import LocalEntryNotFoundError
 from llama_cpp import Llama
+from llama_cpp.llama_cache import LlamaRAMCache
 
+# Live Llama instances, keyed by model path and constructor arguments.
+#
+# Values are weak references, so the cache never keeps a model in memory. It
+# lets overlapping FakeLLMServer instances (and servers created before the
+# previous instance was garbage-collected) share a model instead of reloading it.
+type _LlamaCacheKey = tuple[str, frozenset[tuple[str, Any]]]
+_llama_cache: weakref.WeakValueDictionary[_LlamaCacheKey, Llama] = (
+    weakref.WeakValueDictionary()
+)
+_llama_cache_lock = threading.Lock()
 
-@dataclass(frozen=True)
+# Serializes Llama construction across threads.
+#
+# With verbose=False, llama-cpp-python silences llama.cpp while it builds a model
+# by redirecting the process-wide stdout and stderr file descriptors to /dev/null.
+# Overlapping constructions restore each other's redirections, which leaves the
+# process writing to /dev/null for good.
+_llama_construction_lock = threading.Lock()
+
+
+def clear_llama_cache() -> None:
+    """Forgets all the Llama instances cached by DownloadedModel.load()."""
+    with _llama_cache_lock:
+        _llama_cache.clear()
+
+
+def _prefetch_model_file(model_path: str) -> None:
+    """Asks the OS to start reading a model file into the page cache.
+
+    This is only a hint, so it does nothing on platforms without posix_fadvise()
+    and ignores errors.
+
+    Args:
+        model_path: The path to the model file.
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    with contextlib.suppress(OSError):
+        fd = os.open(model_path, os.O_RDONLY)
+        try:
+            # A length of 0 covers the whole file.
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        finally:
+            os.close(fd)
+
+
+@dataclass(frozen=True, slots=True)
 class DownloadedModel:
     """Identifies a model on the local filesystem."""
 
@@ -19,6 +75,10 @@ class DownloadedModel:
     def load(self, **kwargs: Any) -> Llama:  # noqa: ANN401
         """Loads the model using llama.cpp.
 
+        Returns a cached instance if the same model was loaded with the same
+        hashable arguments and that instance is still alive. New instances are warmed up
+        with a one-token completion.
+
         Args:
             **kwargs: Additional arguments to pass to the Llama constructor.
 
@@ -26,10 +86,23 @@ class DownloadedModel:
             A Llama instance.
         """
         n_threads = psutil.cpu_count(logical=False) or os.process_cpu_count() or 1
+        # Prompt processing is compute-bound, so it benefits from SMT threads.
+        # Token generation is memory-bound, so it only uses physical cores.
+        n_threads_batch = max(n_threads, os.process_cpu_count() or 1)
         llama_kwargs = {
             "model_path": self.model_path,
             "n_ctx": 2048,
+            # llama-cpp-python allocates an n_batch x vocabulary logits array, which
+            # prompt cache entries copy. That is 512 MiB for Gemma 3 at this size,
+            # so n_batch is not raised to n_ctx.
+            "n_batch": 512,
             "n_threads": n_threads,
+            "n_threads_batch": n_threads_batch,
+            # mmap lets the OS share the weights across loads of the same model.
+            "use_mmap": True,
+            # Locking keeps the weights from being paged out under memory pressure,
+            # but it requires a large enough RLIMIT_MEMLOCK, so it is opt-in.
+            "use_mlock": os.environ.get("FAKE_LLM_MLOCK", "0") == "1",
             "verbose": False,
         }
 
@@ -40,10 +113,78 @@ class DownloadedModel:
         # Allow overrides
         llama_kwargs.update(kwargs)
 
-        return Llama(**cast("dict[str, Any]", llama_kwargs))
+        try:
+            cache_key: _LlamaCacheKey | None = (
+                self.model_path,
+                frozenset(llama_kwargs.items()),
+            )
+        except TypeError:
+            # Some valid arguments are unhashable, such as tensor_split=[...] and
+            # kv_overrides={...}. Instances created with them are not cached.
+            cache_key = None
+
+        if cache_key is not None:
+            with _llama_cache_lock:
+                llama = _llama_cache.get(cache_key)
+            if llama is not None:
+                return llama
+
+        # The kernel reads ahead while llama.cpp parses the model's metadata, so the
+        # weights' pages are mostly resident by the time the warm-up touches them.
+        _prefetch_model_file(self.model_path)
+
+        # Constructing outside the cache lock lets cached models be looked up while
+        # another model loads. The warm-up below still runs concurrently.
+        with _llama_construction_lock:
+            llama = Llama(**cast("dict[str, Any]", llama_kwargs))
 
+        # Evaluating a token up front pages in the weights and warms up llama.cpp's
+        # buffers while the server starts, instead of during the first request.
+        # This runs before the prompt cache is attached, so it isn't cached.
+        llama.create_completion(" ", max_tokens=1, temperature=0.0)
 
-@dataclass(frozen=True)
+        # Opt-in, because LlamaRAMCache doesn't count the logits stored with each
+        # entry towards its capacity, and those can exceed the KV cache size.
+        prompt_cache_bytes = int(os.environ.get("FAKE_LLM_CACHE_BYTES", "0"))
+        if prompt_cache_bytes > 0:
+            llama.set_cache(LlamaRAMCache(capacity_bytes=prompt_cache_bytes))
+
+        if cache_key is None:
+            return llama
+        with _llama_cache_lock:
+            return _llama_cache.setdefault(cache_key, llama)
+
+
+@functools.lru_cache(maxsize=128)
+def list_gguf_files(repo_id: str) -> tuple[str, ...]:
+    """Lists the .gguf files in a Hugging Face repository.
+
+    Results are cached for the lifetime of the process, so resolving the same
+    repository again does not require a network round-trip.
+
+    Args:
+        repo_id: The Hugging Face repo ID (e.g., "username/repo_name").
+
+    Returns:
+        The paths of the .gguf files in the repository.
+    """
+    return tuple(f for f in list_repo_files(repo_id=repo_id) if f.endswith(".gguf"))
+
+
+# Matches the suffix of a model split into multiple files by llama.cpp's
+# gguf-split tool, such as "model-00001-of-00003.gguf".
+_GGUF_SHARD_PATTERN = re.compile(r"-\d{5}-of-(?P<count>\d{5})\.gguf$")
+
+
+# Quantizations to look for in repositories, in decreasing order of preference.
+#
+# Q4_K_M is a good trade-off between CPU inference time and quality. The other
+# 4-bit quantizations are similarly sized, so they are preferred over an
+# arbitrary (possibly unquantized) file.
+PREFERRED_QUANTIZATIONS = ("q4_k_m", "q4_k_s", "iq4_xs", "q4_0")
+
+
+@dataclass(frozen=True, slots=True)
 class ModelSpec:
     """Identifies a model that can be downloaded from Hugging Face Hub."""
 
@@ -65,21 +206,26 @@ class ModelSpec:
             ValueError: If the repo does not exist or has no suitable .gguf files.
         """
         try:
-            files = list_repo_files(repo_id=repo_id)
+            gguf_files = list_gguf_files(repo_id)
         except Exception as e:
             msg = f"Could not list files for repo {repo_id}: {e}"
             raise ValueError(
                 msg,
             ) from e
 
-        gguf_files = [f for f in files if f.endswith(".gguf")]
         if not gguf_files:
             msg = f"No .gguf files found in {repo_id}"
             raise ValueError(msg)
 
-        # Prefer q4_k_m
-        preferred = [f for f in gguf_files if "q4_k_m" in f.lower()]
-        filename = preferred[0] if preferred else gguf_files[0]
+        def quantization_rank(filename: str) -> int:
+            lowered = filename.lower()
+            for rank, quantization in enumerate(PREFERRED_QUANTIZATIONS):
+                if quantization in lowered:
+                    return rank
+            return len(PREFERRED_QUANTIZATIONS)
+
+        # min() returns the first of the equally preferred files.
+        filename = min(gguf_files, key=quantization_rank)
 
         return cls(model_name=repo_id, repo_id=repo_id, filename=filename)
 
@@ -96,15 +242,16 @@ class ModelSpec:
         Raises:
             ValueError: If the model is not supported or cannot be found.
         """
-        if model_name in SUPPORTED_MODEL_ALIASES:
-            return SUPPORTED_MODEL_ALIASES[model_name]
+        spec = SUPPORTED_MODEL_ALIASES.get(model_name)
+        if spec is not None:
+            return spec
 
         if "/" in model_name:
             return cls.from_repo_id(model_name)
 
         msg = (
             f"Model '{model_name}' not supported. "
-            f"Available models: {list(SUPPORTED_MODEL_ALIASES.keys())}"
+            f"Available models: {list(SUPPORTED_MODEL_ALIASES)}"
         )
         raise ValueError(msg)
 
@@ -113,52 +260,123 @@ class ModelSpec:
 
         Returns:
             A DownloadedModel containing the path to the downloaded model file.
+
+        Raises:
+            RuntimeError: If the model could not be downloaded.
         """
         try:
-            model_path = hf_hub_download(
-                repo_id=self.repo_id,
-                filename=self.filename,
-                # We rely on the default cache dir or environment variables.
-            )
+            shard_match = _GGUF_SHARD_PATTERN.search(self.filename)
+            if shard_match is None:
+                model_path = self._download_file()
+            else:
+                model_path = self._download_shards(shard_match)
             return DownloadedModel(model_name=self.model_name, model_path=model_path)
-        except Exception as e:
+        # huggingface_hub's HTTP status, missing file, and offline cache errors are
+        # OSErrors. Connection errors and timeouts that persist after its retries
+        # are re-raised as httpx errors. Anything else is a bug, so it is not
+        # disguised as a download failure.
+        except (OSError, httpx.HTTPError) as e:
             msg = f"Failed to download model from {self.repo_id}: {e}"
             raise RuntimeError(
                 msg,
             ) from e
 
+    def _download_file(self) -> str:
+        """Downloads the model file, unless it is already cached.
+
+        Returns:
+            The path to the model file.
+        """
+        # A cached file is used without asking the Hub whether it changed. This
+        # saves a network round-trip when the model is already downloaded.
+        try:
+            return hf_hub_download(
+                repo_id=self.repo_id,
+                filename=self.filename,
+                local_files_only=True,
+            )
+        except LocalEntryNotFoundError:
+            return hf_hub_download(
+                repo_id=self.repo_id,
+                filename=self.filename,
+                # We rely on the default cache dir or environment variables.
+            )
+
+    def _download_shards(self, shard_match: re.Match[str]) -> str:
+        """Downloads all the files of a model split by gguf-split.
+
+        The files are used without contacting the Hub if they are all cached.
+
+        Args:
+            shard_match: The _GGUF_SHARD_PATTERN match in the model's filename.
+
+        Returns:
+            The path to the model's first file, which llama.cpp loads.
+        """
+        prefix = self.filename[: shard_match.start()]
+        count = shard_match["count"]
+        allow_patterns = [f"{prefix}-*-of-{count}.gguf"]
+        shard_names = [
+            f"{prefix}-{index:05d}-of-{count}.gguf"
+            for index in range(1, int(count) + 1)
+        ]
+
+        # A cached snapshot may hold other files from the repository, but not all
+        # of the shards, so their presence must be checked.
+        try:
+            snapshot_path = Path(
+                snapshot_download(
+                    repo_id=self.repo_id,
+                    allow_patterns=allow_patterns,
+                    local_files_only=True,
+                )
+            )
+        except LocalEntryNotFoundError:
+            snapshot_path = None
+        if snapshot_path is None or not all(
+            (snapshot_path / name).is_file() for name in shard_names
+        ):
+            snapshot_path = Path(
+                snapshot_download(repo_id=self.repo_id, allow_patterns=allow_patterns)
+            )
+
+        return str(snapshot_path / shard_names[0])
+
 
-# Define supported models
-SUPPORTED_MODEL_ALIASES: dict[str, ModelSpec] = {
-    "qwen-2.5-coder-3b": ModelSpec(
-        model_name="qwen-2.5-coder-3b",
-        repo_id="Qwen/Qwen2.5-Coder-3B-Instruct-GGUF",
-        filename="qwen2.5-coder-3b-instruct-q4_k_m.gguf",
-    ),
-    "qwen-2.5-coder-1.5b": ModelSpec(
-        model_name="qwen-2.5-coder-1.5b",
-        repo_id="Qwen/Qwen2.5-Coder-1.5B-Instruct-GGUF",
-        filename="qwen2.5-coder-1.5b-instruct-q4_k_m.gguf",
-    ),
-    "llama-3.2-3b-instruct": ModelSpec(
-        model_name="llama-3.2-3b-instruct",
-        repo_id="bartowski/Llama-3.2-3B-Instruct-GGUF",
-        filename="Llama-3.2-3B-Instruct-Q4_K_M.gguf",
-    ),
-    "smollm3": ModelSpec(
-        model_name="smollm3",
-        repo_id="ggml-org/SmolLM3-3B-GGUF",
-        filename="SmolLM3-Q4_K_M.gguf",
-    ),
-    "gemma-3-1b": ModelSpec(
-        model_name="gemma-3-1b",
-        repo_id="unsloth/gemma-3-1b-it-GGUF",
-        filename="gemma-3-1b-it-Q4_K_M.gguf",
-    ),
-    "gemma-3-270m": ModelSpec(
-        model_name="gemma-3-270m",
-        repo_id="unsloth/gemma-3-270m-it-GGUF",
-        filename="gemma-3-270m-it-Q4_K_M.gguf",
-    ),
-    # Aliases or fallbacks can be added here
-}
+# Define supported models. The mapping is read-only, because it is shared by all
+# the servers in the process.
+SUPPORTED_MODEL_ALIASES: Mapping[str, ModelSpec] = MappingProxyType(
+    {
+        "qwen-2.5-coder-3b": ModelSpec(
+            model_name="qwen-2.5-coder-3b",
+            repo_id="Qwen/Qwen2.5-Coder-3B-Instruct-GGUF",
+            filename="qwen2.5-coder-3b-instruct-q4_k_m.gguf",
+        ),
+        "qwen-2.5-coder-1.5b": ModelSpec(
+            model_name="qwen-2.5-coder-1.5b",
+            repo_id="Qwen/Qwen2.5-Coder-1.5B-Instruct-GGUF",
+            filename="qwen2.5-coder-1.5b-instruct-q4_k_m.gguf",
+        ),
+        "llama-3.2-3b-instruct": ModelSpec(
+            model_name="llama-3.2-3b-instruct",
+            repo_id="bartowski/Llama-3.2-3B-Instruct-GGUF",
+            filename="Llama-3.2-3B-Instruct-Q4_K_M.gguf",
+        ),
+        "smollm3": ModelSpec(
+            model_name="smollm3",
+            repo_id="ggml-org/SmolLM3-3B-GGUF",
+            filename="SmolLM3-Q4_K_M.gguf",
+        ),
+        "gemma-3-1b": ModelSpec(
+            model_name="gemma-3-1b",
+            repo_id="unsloth/gemma-3-1b-it-GGUF",
+            filename="gemma-3-1b-it-Q4_K_M.gguf",
+        ),
+        "gemma-3-270m": ModelSpec(
+            model_name="gemma-3-270m",
+            repo_id="unsloth/gemma-3-270m-it-GGUF",
+            filename="gemma-3-270m-it-Q4_K_M.gguf",
+        ),
+        # Aliases or fallbacks can be added here
+    }
+)
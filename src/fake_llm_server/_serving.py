@@ -13,25 +13,17 @@ from ._api_server import ServingConfiguration, create_server_app, parse_server_a
 
 
 class ServerState:
-    """Stores information created by the uvicorn server start."""
+    """Stores information created by the uvicorn server start.
+
+    The serving thread sets `server` before the server starts, and the main
+    thread reads it after `started_event` is set. The event provides the
+    synchronization, so the attributes don't need a lock.
+    """
 
     def __init__(self) -> None:
-        self._lock = threading.Lock()
-        self._server: uvicorn.Server = uvicorn.Server(config=uvicorn.Config(app=""))
+        self.server: uvicorn.Server | None = None
         self.started_event = threading.Event()
 
-    @property
-    def server(self) -> uvicorn.Server:
-        """Returns the uvicorn server instance."""
-        with self._lock:
-            return self._server
-
-    @server.setter
-    def server(self, value: uvicorn.Server) -> None:
-        """Sets the uvicorn server instance."""
-        with self._lock:
-            self._server = value
-
 
 class _NotifyServer(uvicorn.Server):
     """Uvicorn server that notifies when it has started."""
@@ -102,15 +94,23 @@ class FakeLLMServer:
         )
         self._thread.start()
 
-        self._wait_for_start()
+        try:
+            self._wait_for_start()
+        except BaseException:
+            # The caller never receives this instance, so it can't shut it down.
+            self._shutdown()
+            raise
 
     def _wait_for_start(self) -> None:
         """Waits for the server to become ready.
 
+        The wait is event-driven, so it returns as soon as the server starts. The
+        timeout only bounds how long it takes to notice a dead serving thread.
+
         Raises:
             RuntimeError: If the server thread dies.
         """
-        while not self._server_state.started_event.wait(0.1):
+        while not self._server_state.started_event.wait(timeout=1.0):
             if not self._thread.is_alive():
                 msg = "Server thread died unexpectedly"
                 raise RuntimeError(msg)
@@ -131,12 +131,16 @@ class FakeLLMServer:
 
     def _shutdown(self) -> None:
         """Shuts down the server and joins the background thread."""
-        if self._server_state.server:
+        if self._server_state.server is not None:
             self._server_state.server.should_exit = True
 
         if self._thread.is_alive():
             self._thread.join(timeout=5)
 
+        # uvicorn closes the socket when it stops. This covers serving threads that
+        # died before uvicorn started, which make __init__ fail.
+        self._server_socket.close()
+
 
 @contextmanager
 def open_fake_llm_server(
@@ -0,0 +1,61 @@
+"""Shared fixtures for the Fake LLM Server tests."""
+
+from collections.abc import Iterator
+
+import pytest
+from openai import OpenAI
+
+from fake_llm_server import FakeLLMServer, open_fake_llm_server
+from fake_llm_server._models import list_gguf_files
+
+
+@pytest.fixture(scope="session")
+def model_name() -> str:
+    """Fixture that names the model served to the endpoint tests.
+
+    Returns:
+        The name of the model loaded by the shared server.
+    """
+    # Use gemma-3-270m (smallest) for feature tests.
+    return "gemma-3-270m"
+
+
+@pytest.fixture(scope="session")
+def server(model_name: str) -> Iterator[FakeLLMServer]:
+    """Fixture that starts a FakeLLMServer shared by all the tests in the session.
+
+    The server keeps its model alive, so other tests that open a server for the
+    same model reuse the loaded instance instead of loading the model again.
+
+    Args:
+        model_name: The name of the model to serve.
+
+    Yields:
+        A running FakeLLMServer instance.
+    """
+    with open_fake_llm_server(model_names=(model_name,)) as s:
+        yield s
+
+
+@pytest.fixture(scope="session")
+def client(server: FakeLLMServer) -> Iterator[OpenAI]:
+    """Fixture that provides an OpenAI client connected to the shared server.
+
+    Reusing the client across tests reuses its HTTP keep-alive connections.
+
+    Args:
+        server: The running server instance.
+
+    Yields:
+        An OpenAI client.
+    """
+    with OpenAI(**server.openai_client_args()) as c:
+        yield c
+
+
+@pytest.fixture(autouse=True)
+def _clear_repo_files_cache() -> Iterator[None]:
+    """Prevents repository listings cached by one test from leaking into another."""
+    list_gguf_files.cache_clear()
+    yield
+    list_gguf_files.cache_clear()
@@ -1,54 +1,34 @@
 """Tests for the FakeLLMServer API endpoints."""
 
-from collections.abc import Generator
+from concurrent.futures import ThreadPoolExecutor
 
-import pytest
 from openai import OpenAI
 
-from fake_llm_server import FakeLLMServer, open_fake_llm_server
 
-
-@pytest.fixture(scope="module")
-def server() -> Generator[FakeLLMServer]:
-    """Fixture that starts and stops a FakeLLMServer instance for testing.
-
-    Yields:
-        A running FakeLLMServer instance.
-    """
-    # Use gemma-3-270m (smallest) for feature tests.
-    model_name = "gemma-3-270m"
-    with open_fake_llm_server(model_names=(model_name,)) as s:
-        yield s
-
-
-def test_list_models(server: FakeLLMServer) -> None:
+def test_list_models(client: OpenAI, model_name: str) -> None:
     """Verifies the list models endpoint.
 
     Args:
-        server: The running server instance.
+        client: An OpenAI client connected to the running server.
+        model_name: The name of the model served by the server.
     """
-    client_args = server.openai_client_args()
-    client = OpenAI(**client_args)
-
     models = client.models.list()
     assert len(models.data) > 0
     # Check that our model ID is in the list
-    assert any(m.id == "gemma-3-270m" for m in models.data)
+    assert any(m.id == model_name for m in models.data)
 
 
-def test_chat_completion(server: FakeLLMServer) -> None:
+def test_chat_completion(client: OpenAI, model_name: str) -> None:
     """Verifies the chat completion endpoint.
 
     Args:
-        server: The running server instance.
+        client: An OpenAI client connected to the running server.
+        model_name: The name of the model served by the server.
     """
-    client_args = server.openai_client_args()
-    client = OpenAI(**client_args)
-
     response = client.chat.completions.create(
-        model="gemma-3-270m",
+        model=model_name,
         messages=[{"role": "user", "content": "Hello!"}],
-        max_tokens=10,
+        max_tokens=1,
         temperature=0,
     )
 
@@ -56,30 +36,73 @@ def test_chat_completion(server: FakeLLMServer) -> None:
     assert content
 
 
-def test_temperature_effect(server: FakeLLMServer) -> None:
-    """Verifies that setting a high temperature affects the response content.
+def test_chat_completion_stream(client: OpenAI, model_name: str) -> None:
+    """Verifies the chat completion endpoint with streaming enabled.
 
     Args:
-        server: The running server instance.
+        client: An OpenAI client connected to the running server.
+        model_name: The name of the model served by the server.
     """
-    client_args = server.openai_client_args()
-    client = OpenAI(**client_args)
+    stream = client.chat.completions.create(
+        model=model_name,
+        messages=[{"role": "user", "content": "Hello!"}],
+        max_tokens=10,
+        temperature=0,
+        stream=True,
+    )
+
+    content = "".join(
+        chunk.choices[0].delta.content or "" for chunk in stream if chunk.choices
+    )
+    assert content
 
+
+def test_concurrent_chat_completions(client: OpenAI, model_name: str) -> None:
+    """Verifies that concurrent requests for the same model all succeed.
+
+    Args:
+        client: An OpenAI client connected to the running server.
+        model_name: The name of the model served by the server.
+    """
+
+    def complete(prompt: str) -> str | None:
+        response = client.chat.completions.create(
+            model=model_name,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=10,
+            temperature=0,
+        )
+        return response.choices[0].message.content
+
+    prompts = ["Hello!", "What is 2+2?", "Name a color.", "Say hi."]
+    with ThreadPoolExecutor(max_workers=len(prompts)) as executor:
+        contents = list(executor.map(complete, prompts))
+
+    assert all(contents)
+
+
+def test_temperature_effect(client: OpenAI, model_name: str) -> None:
+    """Verifies that setting a high temperature affects the response content.
+
+    Args:
+        client: An OpenAI client connected to the running server.
+        model_name: The name of the model served by the server.
+    """
     prompt = [{"role": "user", "content": "Write a short poem about coding."}]
 
     # Low temperature (deterministic-ish)
     resp_low = client.chat.completions.create(
-        model="gemma-3-270m",
+        model=model_name,
         messages=prompt,  # type: ignore[arg-type]
-        max_tokens=20,
+        max_tokens=1,
         temperature=0.0,
     )
 
     # High temperature (random-ish)
     resp_high = client.chat.completions.create(
-        model="gemma-3-270m",
+        model=model_name,
         messages=prompt,  # type: ignore[arg-type]
-        max_tokens=20,
+        max_tokens=1,
         temperature=0.9,
     )
 
@@ -88,24 +111,22 @@ def test_temperature_effect(server: FakeLLMServer) -> None:
     assert resp_high.choices[0].message.content
 
 
-def test_default_temperature_is_zero(server: FakeLLMServer) -> None:
+def test_default_temperature_is_zero(client: OpenAI, model_name: str) -> None:
     """Verifies that the default temperature is zero (deterministic).
 
     Runs a subjective query multiple times and asserts that the responses are identical.
 
     Args:
-        server: The running server instance.
+        client: An OpenAI client connected to the running server.
+        model_name: The name of the model served by the server.
     """
-    client_args = server.openai_client_args()
-    client = OpenAI(**client_args)
-
     # A subjective prompt that would vary with high temperature
     prompt = [{"role": "user", "content": "Write a haiku about the rust language."}]
 
     responses: list[str] = []
     for _ in range(3):
         resp = client.chat.completions.create(
-            model="gemma-3-270m",
+            model=model_name,
             messages=prompt,  # type: ignore[arg-type]
             max_tokens=30,
             # temperature is omitted to test the default
@@ -0,0 +1,54 @@
+"""Tests for the Jinja2ChatFormatter patch applied by the API server."""
+
+import os
+import subprocess
+import sys
+
+from llama_cpp import llama_chat_format
+
+# Importing the API server applies the patch.
+from fake_llm_server import _api_server  # noqa: F401
+
+# Reloading re-executes the module in place, which replaces its process-wide
+# state, such as the per-model inference executors used by the session server.
+# So the reload happens in a separate interpreter.
+_RELOAD_CHECK = """
+import importlib
+import inspect
+
+from llama_cpp import llama_chat_format
+
+from fake_llm_server import _api_server
+
+importlib.reload(_api_server)
+
+patched_init = llama_chat_format.Jinja2ChatFormatter.__init__
+original_init = inspect.unwrap(patched_init)
+assert patched_init.__wrapped__ is original_init
+assert not hasattr(original_init, "__wrapped__")
+"""
+
+
+def test_malformed_template_does_not_raise() -> None:
+    """Verifies that a formatter can be created with a malformed template."""
+    template = "{% unknown_tag %}"
+
+    formatter = llama_chat_format.Jinja2ChatFormatter(template, "</s>", "<s>")
+
+    assert formatter.template == template
+
+
+def test_reload_does_not_stack_patches() -> None:
+    """Verifies that reloading the API server module patches the original init."""
+    # The child imports the same fake_llm_server, even if it isn't installed.
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", _RELOAD_CHECK],
+        capture_output=True,
+        env=env,
+        check=False,
+        text=True,
+        timeout=120,
+    )
+
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,249 @@
+"""Tests for streaming chat completions, using a stub instead of llama.cpp."""
+
+import threading
+import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, cast
+
+import httpx
+import pytest
+from openai import OpenAI
+
+from fake_llm_server import FakeLLMServer
+
+if TYPE_CHECKING:
+    from llama_cpp import Llama
+
+# Prompts that make _StubLlama fail, like llama.cpp does for oversized prompts.
+_FAILING_PROMPT = "fail before generating"
+_FAILING_MID_STREAM_PROMPT = "fail while generating"
+
+
+class _StubLlama:
+    """Stands in for a Llama instance, generating a fixed number of chunks."""
+
+    def __init__(self, chunk_count: int = 20) -> None:
+        """Initializes the stub.
+
+        Args:
+            chunk_count: The number of chunks in each streamed completion.
+        """
+        self.chunk_count = chunk_count
+        self.stream_closed = threading.Event()
+
+    def create_chat_completion(
+        self,
+        messages: list[dict[str, str]],
+        *,
+        stream: bool = False,
+        **_: Any,  # noqa: ANN401
+    ) -> Any:  # noqa: ANN401
+        """Returns a completion, or a stream of completion chunks."""
+        prompt = messages[-1]["content"]
+        if stream:
+            return self._stream(prompt)
+        return {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": 0,
+            "model": "stub",
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "Hi"},
+                    "finish_reason": "stop",
+                }
+            ],
+        }
+
+    def _stream(self, prompt: str) -> Iterator[dict[str, Any]]:
+        """Generates chunks lazily, like llama.cpp's streaming completions."""
+        try:
+            if prompt == _FAILING_PROMPT:
+                msg = "Requested tokens exceed context window"
+                raise ValueError(msg)
+            for index in range(self.chunk_count):
+                if index == 1 and prompt == _FAILING_MID_STREAM_PROMPT:
+                    msg = "Generation failed"
+                    raise RuntimeError(msg)
+                time.sleep(0.01)
+                yield {
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion.chunk",
+                    "created": 0,
+                    "model": "stub",
+                    "choices": [
+                        {
+                            "index": 0,
+                            "delta": {"content": "x"},
+                            "finish_reason": None,
+                        }
+                    ],
+                }
+        finally:
+            self.stream_closed.set()
+
+
+@pytest.fixture
+def stub_llm() -> _StubLlama:
+    """Fixture that provides a stub model.
+
+    Returns:
+        A _StubLlama instance.
+    """
+    return _StubLlama()
+
+
+@pytest.fixture
+def stub_server(stub_llm: _StubLlama) -> Iterator[FakeLLMServer]:
+    """Fixture that serves the stub model.
+
+    Args:
+        stub_llm: The stub model to serve.
+
+    Yields:
+        A running FakeLLMServer instance.
+    """
+    server = FakeLLMServer(serving_configuration={"stub": cast("Llama", stub_llm)})
+    try:
+        yield server
+    finally:
+        server._shutdown()  # noqa: SLF001
+
+
+@pytest.fixture
+def stub_client(stub_server: FakeLLMServer) -> Iterator[OpenAI]:
+    """Fixture that provides an OpenAI client connected to the stub server.
+
+    Args:
+        stub_server: The running server instance.
+
+    Yields:
+        An OpenAI client that doesn't retry failed requests.
+    """
+    with OpenAI(
+        **stub_server.openai_client_args(), max_retries=0, timeout=10
+    ) as client:
+        yield client
+
+
+def test_stream_disconnect_releases_model(
+    stub_llm: _StubLlama, stub_client: OpenAI
+) -> None:
+    """Verifies that a client disconnecting mid-stream frees the model.
+
+    Args:
+        stub_llm: The stub model served by the server.
+        stub_client: An OpenAI client connected to the server.
+    """
+    stub_llm.chunk_count = 100_000
+    stream = stub_client.chat.completions.create(
+        model="stub", messages=[{"role": "user", "content": "Hi"}], stream=True
+    )
+    for _ in stream:
+        break
+    stream.close()
+
+    assert stub_llm.stream_closed.wait(timeout=5)
+    response = stub_client.chat.completions.create(
+        model="stub", messages=[{"role": "user", "content": "Hi"}]
+    )
+    assert response.choices[0].message.content == "Hi"
+
+
+def test_stream_error_before_first_chunk_returns_500(
+    stub_server: FakeLLMServer,
+) -> None:
+    """Verifies that errors before streaming starts produce an HTTP error.
+
+    Args:
+        stub_server: The running server instance.
+    """
+    base_url = stub_server.openai_client_args()["base_url"]
+
+    response = httpx.post(
+        f"{base_url}/chat/completions",
+        json={
+            "model": "stub",
+            "messages": [{"role": "user", "content": _FAILING_PROMPT}],
+            "stream": True,
+        },
+        timeout=10,
+    )
+
+    assert response.status_code == 500
+    assert "exceed context window" in response.json()["detail"]
+
+
+def test_stream_error_mid_stream_releases_model(
+    stub_llm: _StubLlama, stub_server: FakeLLMServer, stub_client: OpenAI
+) -> None:
+    """Verifies that an error while streaming ends the response and frees the model.
+
+    Args:
+        stub_llm: The stub model served by the server.
+        stub_server: The running server instance.
+        stub_client: An OpenAI client connected to the server.
+    """
+    base_url = stub_server.openai_client_args()["base_url"]
+
+    with httpx.stream(
+        "POST",
+        f"{base_url}/chat/completions",
+        json={
+            "model": "stub",
+            "messages": [{"role": "user", "content": _FAILING_MID_STREAM_PROMPT}],
+            "stream": True,
+        },
+        timeout=10,
+    ) as response:
+        assert response.status_code == 200
+        # The response was already started, so it can only be cut short.
+        with pytest.raises(httpx.RemoteProtocolError):
+            for _ in response.iter_lines():
+                pass
+
+    assert stub_llm.stream_closed.wait(timeout=5)
+    completion = stub_client.chat.completions.create(
+        model="stub", messages=[{"role": "user", "content": "Hi"}]
+    )
+    assert completion.choices[0].message.content == "Hi"
+
+
+def test_queued_requests_do_not_starve_stream(
+    stub_server: FakeLLMServer, stub_client: OpenAI
+) -> None:
+    """Verifies that requests queued behind a stream don't stall the server.
+
+    There are more queued requests than threads in Starlette's threadpool.
+
+    Args:
+        stub_server: The running server instance.
+        stub_client: An OpenAI client connected to the server.
+    """
+    request_count = 45
+
+    def complete() -> str | None:
+        with OpenAI(
+            **stub_server.openai_client_args(), max_retries=0, timeout=20
+        ) as client:
+            response = client.chat.completions.create(
+                model="stub", messages=[{"role": "user", "content": "Hi"}]
+            )
+        return response.choices[0].message.content
+
+    stream = stub_client.chat.completions.create(
+        model="stub", messages=[{"role": "user", "content": "Hi"}], stream=True
+    )
+    chunks = iter(stream)
+    next(chunks)
+    with ThreadPoolExecutor(max_workers=request_count) as executor:
+        futures = [executor.submit(complete) for _ in range(request_count)]
+
+        # Other endpoints still respond while the requests are queued.
+        assert stub_client.models.list().data
+        rest = "".join(chunk.choices[0].delta.content or "" for chunk in chunks)
+        assert rest
+
+        assert all(future.result(timeout=20) == "Hi" for future in futures)
@@ -1,8 +1,11 @@
 """Tests for model downloading and verifying file sizes."""
 
 from pathlib import Path
+from unittest.mock import MagicMock, patch
 
+import httpx
 import pytest
+from huggingface_hub.errors import LocalEntryNotFoundError
 
 from fake_llm_server._models import SUPPORTED_MODEL_ALIASES, ModelSpec
 
@@ -40,3 +43,180 @@ def test_model_download_and_size(model_name: str) -> None:
         )
     except (RuntimeError, ValueError) as e:
         pytest.fail(f"Download failed for {model_name}: {e}")
+
+
+@patch("fake_llm_server._models.hf_hub_download")
+@patch("fake_llm_server._models.snapshot_download")
+def test_download_sharded_model(
+    mock_snapshot_download: MagicMock, mock_hf_hub_download: MagicMock
+) -> None:
+    """Verifies that all the files of a sharded model are downloaded.
+
+    Args:
+        mock_snapshot_download: Mocked snapshot_download function.
+        mock_hf_hub_download: Mocked hf_hub_download function.
+    """
+    mock_snapshot_download.return_value = "/cache/snapshot"
+    spec = ModelSpec(
+        model_name="user/repo",
+        repo_id="user/repo",
+        filename="q4_k_m/model-Q4_K_M-00002-of-00003.gguf",
+    )
+
+    downloaded = spec.download()
+
+    mock_hf_hub_download.assert_not_called()
+    # The cached snapshot doesn't contain the shards, so they are downloaded.
+    mock_snapshot_download.assert_called_with(
+        repo_id="user/repo",
+        allow_patterns=["q4_k_m/model-Q4_K_M-*-of-00003.gguf"],
+    )
+    assert downloaded.model_path == str(
+        Path("/cache/snapshot/q4_k_m/model-Q4_K_M-00001-of-00003.gguf")
+    )
+
+
+@patch("fake_llm_server._models.snapshot_download")
+def test_download_uses_cached_shards(
+    mock_snapshot_download: MagicMock, tmp_path: Path
+) -> None:
+    """Verifies that cached shards are used without contacting the Hub.
+
+    Args:
+        mock_snapshot_download: Mocked snapshot_download function.
+        tmp_path: A temporary directory standing in for the cached snapshot.
+    """
+    for index in range(1, 4):
+        (tmp_path / f"model-Q4_K_M-{index:05d}-of-00003.gguf").write_bytes(b"GGUF")
+    mock_snapshot_download.return_value = str(tmp_path)
+    spec = ModelSpec(
+        model_name="user/repo",
+        repo_id="user/repo",
+        filename="model-Q4_K_M-00001-of-00003.gguf",
+    )
+
+    downloaded = spec.download()
+
+    mock_snapshot_download.assert_called_once_with(
+        repo_id="user/repo",
+        allow_patterns=["model-Q4_K_M-*-of-00003.gguf"],
+        local_files_only=True,
+    )
+    assert downloaded.model_path == str(tmp_path / "model-Q4_K_M-00001-of-00003.gguf")
+
+
+@patch("fake_llm_server._models.snapshot_download")
+def test_download_fetches_uncached_shards(
+    mock_snapshot_download: MagicMock, tmp_path: Path
+) -> None:
+    """Verifies that shards missing from the cache are downloaded.
+
+    Args:
+        mock_snapshot_download: Mocked snapshot_download function.
+        tmp_path: A temporary directory standing in for the downloaded snapshot.
+    """
+    mock_snapshot_download.side_effect = [
+        LocalEntryNotFoundError("not cached"),
+        str(tmp_path),
+    ]
+    spec = ModelSpec(
+        model_name="user/repo",
+        repo_id="user/repo",
+        filename="model-Q4_K_M-00001-of-00003.gguf",
+    )
+
+    downloaded = spec.download()
+
+    assert mock_snapshot_download.call_count == 2
+    mock_snapshot_download.assert_called_with(
+        repo_id="user/repo", allow_patterns=["model-Q4_K_M-*-of-00003.gguf"]
+    )
+    assert downloaded.model_path == str(tmp_path / "model-Q4_K_M-00001-of-00003.gguf")
+
+
+@patch("fake_llm_server._models.hf_hub_download")
+def test_download_uses_cached_file(mock_hf_hub_download: MagicMock) -> None:
+    """Verifies that a cached model file is used without contacting the Hub.
+
+    Args:
+        mock_hf_hub_download: Mocked hf_hub_download function.
+    """
+    mock_hf_hub_download.return_value = "/cache/model.gguf"
+    spec = ModelSpec(model_name="user/repo", repo_id="user/repo", filename="m.gguf")
+
+    downloaded = spec.download()
+
+    mock_hf_hub_download.assert_called_once_with(
+        repo_id="user/repo", filename="m.gguf", local_files_only=True
+    )
+    assert downloaded.model_path == "/cache/model.gguf"
+
+
+@patch("fake_llm_server._models.hf_hub_download")
+def test_download_fetches_uncached_file(mock_hf_hub_download: MagicMock) -> None:
+    """Verifies that a model file missing from the cache is downloaded.
+
+    Args:
+        mock_hf_hub_download: Mocked hf_hub_download function.
+    """
+    mock_hf_hub_download.side_effect = [
+        LocalEntryNotFoundError("not cached"),
+        "/cache/model.gguf",
+    ]
+    spec = ModelSpec(model_name="user/repo", repo_id="user/repo", filename="m.gguf")
+
+    downloaded = spec.download()
+
+    assert mock_hf_hub_download.call_count == 2
+    mock_hf_hub_download.assert_called_with(repo_id="user/repo", filename="m.gguf")
+    assert downloaded.model_path == "/cache/model.gguf"
+
+
+@patch("fake_llm_server._models.hf_hub_download")
+def test_download_wraps_hub_errors(mock_hf_hub_download: MagicMock) -> None:
+    """Verifies that Hugging Face Hub errors are reported as RuntimeError.
+
+    Args:
+        mock_hf_hub_download: Mocked hf_hub_download function.
+    """
+    mock_hf_hub_download.side_effect = [
+        LocalEntryNotFoundError("not cached"),
+        LocalEntryNotFoundError("offline"),
+    ]
+    spec = ModelSpec(model_name="user/repo", repo_id="user/repo", filename="m.gguf")
+
+    with pytest.raises(RuntimeError, match="Failed to download model from user/repo"):
+        spec.download()
+
+
+@patch("fake_llm_server._models.hf_hub_download")
+def test_download_wraps_network_errors(mock_hf_hub_download: MagicMock) -> None:
+    """Verifies that network errors raised by httpx are reported as RuntimeError.
+
+    Args:
+        mock_hf_hub_download: Mocked hf_hub_download function.
+    """
+    mock_hf_hub_download.side_effect = [
+        LocalEntryNotFoundError("not cached"),
+        httpx.ReadTimeout("timed out"),
+    ]
+    spec = ModelSpec(model_name="user/repo", repo_id="user/repo", filename="m.gguf")
+
+    with pytest.raises(RuntimeError, match="Failed to download model from user/repo"):
+        spec.download()
+
+
+@patch("fake_llm_server._models.hf_hub_download")
+def test_download_propagates_unexpected_errors(
+    mock_hf_hub_download: MagicMock,
+) -> None:
+    """Verifies that errors which are not download failures are not wrapped.
+
+    Args:
+        mock_hf_hub_download: Mocked hf_hub_download function.
+    """
+    mock_hf_hub_download.side_effect = TypeError("bad argument")
+    spec = ModelSpec(model_name="user/repo", repo_id="user/repo", filename="m.gguf")
+
+    with pytest.raises(TypeError, match="bad argument"):
+        spec.download()
@@ -1,8 +1,28 @@
 """Tests for loading models with Llama.cpp."""
 
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from unittest.mock import MagicMock, patch
 
-from fake_llm_server._models import DownloadedModel
+import pytest
+from llama_cpp.llama_cache import LlamaRAMCache
+
+from fake_llm_server import _models
+from fake_llm_server._models import DownloadedModel, clear_llama_cache
+
+
+@pytest.fixture(autouse=True)
+def _isolate_llama_cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Gives each test an empty Llama cache.
+
+    The process-wide cache is left alone, so models kept alive by session-scoped
+    fixtures remain available to other tests.
+    """
+    monkeypatch.setattr(_models, "_llama_cache", weakref.WeakValueDictionary())
 
 
 @patch("fake_llm_server._models.Llama")
@@ -59,6 +79,42 @@ def test_load_fallback_minimum(
     assert kwargs["n_threads"] == 1
 
 
+@patch("fake_llm_server._models.Llama")
+@patch("fake_llm_server._models.psutil")
+@patch("fake_llm_server._models.os")
+def test_load_sets_n_threads_batch(
+    mock_os: MagicMock, mock_psutil: MagicMock, mock_llama: MagicMock
+) -> None:
+    """Verifies that load() uses all logical CPUs for prompt processing."""
+    mock_psutil.cpu_count.return_value = 4
+    mock_os.process_cpu_count.return_value = 8
+    model = DownloadedModel(model_name="test-model", model_path="/path/to/model.gguf")
+
+    model.load()
+
+    kwargs = mock_llama.call_args.kwargs
+    assert kwargs["n_threads"] == 4
+    assert kwargs["n_threads_batch"] == 8
+
+
+@patch("fake_llm_server._models.Llama")
+@patch("fake_llm_server._models.psutil")
+@patch("fake_llm_server._models.os")
+def test_load_n_threads_batch_at_least_n_threads(
+    mock_os: MagicMock, mock_psutil: MagicMock, mock_llama: MagicMock
+) -> None:
+    """Verifies that load() never uses fewer threads for prompt processing."""
+    mock_psutil.cpu_count.return_value = 4
+    mock_os.process_cpu_count.return_value = 2
+    model = DownloadedModel(model_name="test-model", model_path="/path/to/model.gguf")
+
+    model.load()
+
+    kwargs = mock_llama.call_args.kwargs
+    assert kwargs["n_threads"] == 4
+    assert kwargs["n_threads_batch"] == 4
+
+
 @patch("fake_llm_server._models.Llama")
 @patch("fake_llm_server._models.psutil")
 def test_load_allows_override_n_threads(
@@ -73,3 +129,266 @@ def test_load_allows_override_n_threads(
     mock_llama.assert_called_once()
     kwargs = mock_llama.call_args.kwargs
     assert kwargs["n_threads"] == 8
+
+
+@patch("fake_llm_server._models.Llama")
+@patch("fake_llm_server._models.psutil")
+def test_load_uses_mmap_without_mlock_by_default(
+    mock_psutil: MagicMock, mock_llama: MagicMock, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Verifies that load() memory-maps the model without locking it by default."""
+    monkeypatch.delenv("FAKE_LLM_MLOCK", raising=False)
+    mock_psutil.cpu_count.return_value = 4
+    model = DownloadedModel(model_name="test-model", model_path="/path/to/model.gguf")
+
+    model.load()
+
+    kwargs = mock_llama.call_args.kwargs
+    assert kwargs["use_mmap"] is True
+    assert kwargs["use_mlock"] is False
+
+
+@patch("fake_llm_server._models.Llama")
+@patch("fake_llm_server._models.psutil")
+def test_load_mlock_from_environment(
+    mock_psutil: MagicMock, mock_llama: MagicMock, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Verifies that load() locks the model in memory if FAKE_LLM_MLOCK is 1."""
+    monkeypatch.setenv("FAKE_LLM_MLOCK", "1")
+    mock_psutil.cpu_count.return_value = 4
+    model = DownloadedModel(model_name="test-model", model_path="/path/to/model.gguf")
+
+    model.load()
+
+    kwargs = mock_llama.call_args.kwargs
+    assert kwargs["use_mmap"] is True
+    assert kwargs["use_mlock"] is True
+
+
+@patch("fake_llm_server._models.Llama")
+@patch("fake_llm_server._models.psutil")
+def test_load_sets_context_and_batch_size(
+    mock_psutil: MagicMock, mock_llama: MagicMock
+) -> None:
+    """Verifies that load() passes explicit context and batch sizes."""
+    mock_psutil.cpu_count.return_value = 4
+    model = DownloadedModel(model_name="test-model", model_path="/path/to/model.gguf")
+
+    model.load()
+
+    kwargs = mock_llama.call_args.kwargs
+    assert kwargs["n_ctx"] == 2048
+    assert kwargs["n_batch"] == 512
+
+
+@patch("fake_llm_server._models.Llama")
+@patch("fake_llm_server._models.psutil")
+def test_load_reuses_live_instance(
+    mock_psutil: MagicMock, mock_llama: MagicMock
+) -> None:
+    """Verifies that load() reuses a live Llama instance for the same model."""
+    mock_psutil.cpu_count.return_value = 4
+    model = DownloadedModel(model_name="test-model", model_path="/path/to/model.gguf")
+
+    first = model.load()
+    second = model.load()
+
+    mock_llama.assert_called_once()
+    assert second is first
+
+
+@patch("fake_llm_server._models.Llama")
+@patch("fake_llm_server._models.psutil")
+def test_clear_llama_cache_forgets_live_instance(
+    mock_psutil: MagicMock, mock_llama: MagicMock
+) -> None:
+    """Verifies that load() creates a new instance after clear_llama_cache()."""
+    mock_psutil.cpu_count.return_value = 4
+    mock_llama.side_effect = lambda **_: MagicMock()
+    model = DownloadedModel(model_name="test-model", model_path="/path/to/model.gguf")
+
+    first = model.load()
+    clear_llama_cache()
+    second = model.load()
+
+    assert mock_llama.call_count == 2
+    assert second is not first
+
+
+@patch("fake_llm_server._models.Llama")
+@patch("fake_llm_server._models.psutil")
+def test_load_accepts_unhashable_args(
+    mock_psutil: MagicMock, mock_llama: MagicMock
+) -> None:
+    """Verifies that load() passes unhashable arguments through to Llama."""
+    mock_psutil.cpu_count.return_value = 4
+    mock_llama.side_effect = lambda **_: MagicMock()
+    model = DownloadedModel(model_name="test-model", model_path="/path/to/model.gguf")
+
+    first = model.load(tensor_split=[0.5, 0.5], kv_overrides={"key": 1})
+    second = model.load(tensor_split=[0.5, 0.5], kv_overrides={"key": 1})
+
+    assert mock_llama.call_count == 2
+    assert mock_llama.call_args.kwargs["tensor_split"] == [0.5, 0.5]
+    assert mock_llama.call_args.kwargs["kv_overrides"] == {"key": 1}
+    assert second is not first
+
+
+@patch("fake_llm_server._models.Llama")
+@patch("fake_llm_server._models.psutil")
+def test_load_does_not_overlap_llama_constructors(
+    mock_psutil: MagicMock, mock_llama: MagicMock
+) -> None:
+    """Verifies that concurrent load() calls construct one Llama at a time."""
+    mock_psutil.cpu_count.return_value = 4
+    active_count = 0
+    max_active_count = 0
+    count_lock = threading.Lock()
+
+    def construct(**_: object) -> MagicMock:
+        nonlocal active_count, max_active_count
+        with count_lock:
+            active_count += 1
+            max_active_count = max(max_active_count, active_count)
+        time.sleep(0.05)
+        with count_lock:
+            active_count -= 1
+        return MagicMock()
+
+    mock_llama.side_effect = construct
+    models = [
+        DownloadedModel(model_name=f"model-{i}", model_path=f"/path/to/model-{i}.gguf")
+        for i in range(4)
+    ]
+
+    with ThreadPoolExecutor(max_workers=len(models)) as executor:
+        list(executor.map(DownloadedModel.load, models))
+
+    assert mock_llama.call_count == len(models)
+    assert max_active_count == 1
+
+
+@patch("fake_llm_server._models.Llama")
+@patch("fake_llm_server._models.psutil")
+def test_load_warms_up_new_instance_once(
+    mock_psutil: MagicMock, mock_llama: MagicMock
+) -> None:
+    """Verifies that load() runs a one-token completion on new instances only."""
+    mock_psutil.cpu_count.return_value = 4
+    model = DownloadedModel(model_name="test-model", model_path="/path/to/model.gguf")
+
+    model.load()
+    model.load()
+
+    mock_llama.return_value.create_completion.assert_called_once()
+    kwargs = mock_llama.return_value.create_completion.call_args.kwargs
+    assert kwargs["max_tokens"] == 1
+
+
+@patch("fake_llm_server._models.Llama")
+@patch("fake_llm_server._models.psutil")
+def test_load_does_not_reuse_instance_with_other_args(
+    mock_psutil: MagicMock, mock_llama: MagicMock
+) -> None:
+    """Verifies that load() creates a new Llama instance for different arguments."""
+    mock_psutil.cpu_count.return_value = 4
+    mock_llama.side_effect = lambda **_: MagicMock()
+    model = DownloadedModel(model_name="test-model", model_path="/path/to/model.gguf")
+
+    first = model.load()
+    second = model.load(n_threads=8)
+
+    assert mock_llama.call_count == 2
+    assert second is not first
+
+
+@patch("fake_llm_server._models.Llama")
+@patch("fake_llm_server._models.psutil")
+def test_load_prompt_cache_disabled_by_default(
+    mock_psutil: MagicMock, mock_llama: MagicMock, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Verifies that load() does not attach a prompt cache by default."""
+    monkeypatch.delenv("FAKE_LLM_CACHE_BYTES", raising=False)
+    mock_psutil.cpu_count.return_value = 4
+    model = DownloadedModel(model_name="test-model", model_path="/path/to/model.gguf")
+
+    model.load()
+
+    mock_llama.return_value.set_cache.assert_not_called()
+
+
+@patch("fake_llm_server._models.Llama")
+@patch("fake_llm_server._models.psutil")
+def test_load_prompt_cache_from_environment(
+    mock_psutil: MagicMock, mock_llama: MagicMock, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Verifies that load() attaches a prompt cache if FAKE_LLM_CACHE_BYTES is set."""
+    monkeypatch.setenv("FAKE_LLM_CACHE_BYTES", str(64 * 1024 * 1024))
+    mock_psutil.cpu_count.return_value = 4
+    model = DownloadedModel(model_name="test-model", model_path="/path/to/model.gguf")
+
+    model.load()
+
+    mock_llama.return_value.set_cache.assert_called_once()
+    cache = mock_llama.return_value.set_cache.call_args.args[0]
+    assert isinstance(cache, LlamaRAMCache)
+    assert cache.capacity_bytes == 64 * 1024 * 1024
+
+
+@pytest.mark.skipif(
+    not hasattr(os, "posix_fadvise"), reason="posix_fadvise() is not available"
+)
+@patch("fake_llm_server._models.Llama")
+@patch("fake_llm_server._models.psutil")
+def test_load_prefetches_model_file(
+    mock_psutil: MagicMock, mock_llama: MagicMock, tmp_path: Path
+) -> None:
+    """Verifies that load() asks the OS to read the model file ahead."""
+    mock_psutil.cpu_count.return_value = 4
+    model_path = tmp_path / "model.gguf"
+    model_path.write_bytes(b"GGUF")
+    model = DownloadedModel(model_name="test-model", model_path=str(model_path))
+
+    with patch("fake_llm_server._models.os.posix_fadvise") as mock_fadvise:
+        model.load()
+
+    mock_fadvise.assert_called_once()
+    assert mock_fadvise.call_args.args[1:] == (0, 0, os.POSIX_FADV_WILLNEED)
+    mock_llama.assert_called_once()
+
+
+@patch("fake_llm_server._models.Llama")
+@patch("fake_llm_server._models.psutil")
+def test_load_ignores_prefetch_errors(
+    mock_psutil: MagicMock, mock_llama: MagicMock, tmp_path: Path
+) -> None:
+    """Verifies that load() doesn't fail if the model file can't be prefetched."""
+    mock_psutil.cpu_count.return_value = 4
+    model_path = tmp_path / "missing.gguf"
+    model = DownloadedModel(model_name="test-model", model_path=str(model_path))
+
+    model.load()
+
+    mock_llama.assert_called_once()
+
+
+@patch("fake_llm_server._models.Llama")
+@patch("fake_llm_server._models.psutil")
+def test_load_skips_prefetch_without_fadvise(
+    mock_psutil: MagicMock,
+    mock_llama: MagicMock,
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+) -> None:
+    """Verifies that load() works on platforms without posix_fadvise()."""
+    monkeypatch.delattr(os, "posix_fadvise", raising=False)
+    mock_psutil.cpu_count.return_value = 4
+    model_path = tmp_path / "model.gguf"
+    model_path.write_bytes(b"GGUF")
+    model = DownloadedModel(model_name="test-model", model_path=str(model_path))
+
+    with patch("fake_llm_server._models.os.open") as mock_open:
+        model.load()
+
+    mock_open.assert_not_called()
+    mock_llama.assert_called_once()
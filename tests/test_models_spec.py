@@ -56,3 +56,16 @@ def test_from_repo_id_method(mock_list_files: MagicMock) -> None:
     spec = ModelSpec.from_repo_id(repo_id)
     assert spec.repo_id == repo_id
     assert spec.filename == "file.gguf"
+
+
+@patch("fake_llm_server._models.list_repo_files")
+def test_from_repo_id_caches_file_list(mock_list_files: MagicMock) -> None:
+    """Test that from_repo_id lists a repository's files only once."""
+    repo_id = "user/cached-repo"
+    mock_list_files.return_value = ["model-q4_k_m.gguf"]
+
+    first = ModelSpec.from_repo_id(repo_id)
+    second = ModelSpec.from_repo_id(repo_id)
+
+    mock_list_files.assert_called_once_with(repo_id=repo_id)
+    assert second == first
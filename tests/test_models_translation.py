@@ -40,6 +40,29 @@ def test_translate_repo_id_with_q4_k_m(mock_list_files: MagicMock) -> None:
     assert spec.filename == "model.q4_k_m.gguf"
 
 
+@patch("fake_llm_server._models.list_repo_files")
+def test_translate_repo_id_with_fallback_quantization(
+    mock_list_files: MagicMock,
+) -> None:
+    """Verifies that other 4-bit quantizations are preferred over arbitrary files.
+
+    Args:
+        mock_list_files: Mocked list_repo_files function.
+    """
+    repo_id = "someuser/fallback-repo"
+    mock_list_files.return_value = [
+        "model.f16.gguf",
+        "model.q8_0.gguf",
+        "model.Q4_0.gguf",
+        "model.Q4_K_S.gguf",
+        "README.md",
+    ]
+
+    spec = ModelSpec.from_name(repo_id)
+    assert spec.repo_id == repo_id
+    assert spec.filename == "model.Q4_K_S.gguf"
+
+
 @patch("fake_llm_server._models.list_repo_files")
 def test_translate_repo_id_without_preference(mock_list_files: MagicMock) -> None:
     """Verifies translation of a repo ID when no preferred file is available.
@@ -1,8 +1,11 @@
 """Tests for verifying FakeLLMServer configuration constraints."""
 
+from unittest.mock import patch
+
 import pytest
 
 from fake_llm_server import open_fake_llm_server
+from fake_llm_server._models import ModelSpec
 
 
 def test_model_names_must_be_tuple() -> None:
@@ -45,6 +48,18 @@ def test_transitive_aliases_not_supported() -> None:
         pass
 
 
+def test_unsupported_model_fails_before_downloads() -> None:
+    """Verifies that an unsupported model name fails before any download starts."""
+    with (
+        patch.object(ModelSpec, "download") as mock_download,
+        pytest.raises(ValueError, match="Model 'typo' not supported"),
+        open_fake_llm_server(model_names=("typo", "qwen-2.5-coder-3b")),
+    ):
+        pass
+
+    mock_download.assert_not_called()
+
+
 def test_valid_configuration() -> None:
     """Verifies that a valid configuration is accepted."""
     with open_fake_llm_server(
@@ -0,0 +1,36 @@
+"""Tests for FakeLLMServer startup failures."""
+
+import socket
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from fake_llm_server import FakeLLMServer
+
+
+# The serving thread is expected to die from the mocked error.
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+@patch("fake_llm_server._serving.create_server_app")
+def test_failed_start_closes_socket(mock_create_server_app: MagicMock) -> None:
+    """Verifies that a server that fails to start releases its socket.
+
+    Args:
+        mock_create_server_app: Mocked create_server_app function.
+    """
+    mock_create_server_app.side_effect = RuntimeError("app setup failed")
+    sockets: list[socket.socket] = []
+    socket_class = socket.socket
+
+    def create_socket(*args: Any) -> socket.socket:  # noqa: ANN401
+        sockets.append(socket_class(*args))
+        return sockets[-1]
+
+    with (
+        patch("fake_llm_server._serving.socket.socket", side_effect=create_socket),
+        pytest.raises(RuntimeError, match="Server thread died unexpectedly"),
+    ):
+        FakeLLMServer(serving_configuration={})
+
+    assert len(sockets) == 1
+    assert sockets[0].fileno() == -1